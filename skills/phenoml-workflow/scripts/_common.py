@@ -0,0 +1,182 @@
+"""
+Shared helpers for the PhenoML workflow scripts.
+
+Imported by the sibling scripts (check_env.py, setup_fhir_provider.py,
+create_workflow.py, test_workflow.py); not meant to be run directly.
+"""
+
+import io
+import os
+import re
+import errno
+import shutil
+import tempfile
+
+import json
+
+# orjson is optional; fall back to the stdlib encoder when it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Shared experiment hosts contain "experiment" in PHENOML_BASE_URL
+_EXPERIMENT_RE = re.compile("experiment", re.IGNORECASE)
+
+# Parsed .env contents keyed by path, so each file is only read once per process
+_ENV_CACHE = {}
+
+# orjson silently turns integers outside the 64-bit range into floats. Any run
+# of 19+ digits might be one, so such text is left to the stdlib parser, which
+# keeps them exact.
+_WIDE_INT_RE = re.compile(r"[0-9]{19}")
+_WIDE_INT_BYTES_RE = re.compile(rb"[0-9]{19}")
+
+def load_env(env_file=None, required=()):
+    """
+    Load a .env file into os.environ, parsing it at most once.
+    Variables already exported in the environment take precedence, so the
+    file is not read at all when every name in `required` is already set.
+    """
+    if required and all(key in os.environ for key in required):
+        return {}
+
+    path = env_file or ".env"
+    if path not in _ENV_CACHE:
+        from dotenv import dotenv_values
+
+        values = dotenv_values(path)
+        _ENV_CACHE[path] = values
+        os.environ.update({k: v for k, v in values.items() if v is not None and k not in os.environ})
+    return _ENV_CACHE[path]
+
+def help_requested(argv):
+    """Check whether argv asks argparse for --help (including its -h and abbreviated forms)"""
+    return any(arg == "-h" or (len(arg) > 2 and "--help".startswith(arg)) for arg in argv)
+
+def json_loads(data):
+    """
+    Parse JSON from str or UTF-8 bytes, keeping integers of any size exact.
+    Raises ValueError (json.JSONDecodeError or its orjson subclass) on invalid input.
+    """
+    if orjson is not None:
+        wide_int_re = _WIDE_INT_RE if isinstance(data, str) else _WIDE_INT_BYTES_RE
+        if not wide_int_re.search(data):
+            return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj):
+    """Serialize obj as 2-space indented JSON text"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+        except orjson.JSONEncodeError:
+            # orjson refuses integers outside the 64-bit range, which the stdlib encoder writes exactly
+            pass
+    return json.dumps(obj, indent=2)
+
+def is_shared_experiment():
+    """Check if the user is on shared experiment (experiment.app.pheno.ml) based on PHENOML_BASE_URL"""
+    base_url = os.getenv("PHENOML_BASE_URL", "")
+    return bool(_EXPERIMENT_RE.search(base_url))
+
+def _copy_with_entry(path, out, prefix, entry):
+    """Copy the .env at path to out, replacing the line starting with prefix or appending entry"""
+    found = False
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            line = b""
+            for line in f:
+                if not found and line.startswith(prefix):
+                    out.write(entry)
+                    found = True
+                else:
+                    out.write(line)
+        if not found and line and not line.endswith(b"\n"):
+            out.write(b"\n")
+    if not found:
+        out.write(entry)
+
+def save_to_env(key, value, env_file=".env", durable=False):
+    """
+    Save or update a key-value pair in .env file.
+    Pass durable=True to fsync the new contents and the rename itself; by
+    default the OS flushes in its own time, since the saved IDs can be
+    regenerated by rerunning setup.
+    """
+    # Work on raw bytes so lines we don't touch are copied without a decode/encode round trip
+    prefix = f"{key}=".encode()
+    entry = prefix + f"{value}\n".encode()
+
+    # Stream the current file into a temp file next to it, swapping in the new
+    # entry, then rename over .env so a crash mid-write can't leave a truncated
+    # credentials file behind. Symlinks are resolved so the link target is
+    # updated rather than the link being replaced by a regular file.
+    target = os.path.realpath(env_file)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".env.", suffix=".tmp")
+    except PermissionError:
+        # .env is writable but its directory isn't, so no temp file can go next
+        # to it; rewrite the file in place instead
+        buf = io.BytesIO()
+        _copy_with_entry(target, buf, prefix, entry)
+        with open(target, 'wb') as f:
+            f.write(buf.getvalue())
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            _copy_with_entry(target, out, prefix, entry)
+            if durable:
+                out.flush()
+                os.fsync(out.fileno())
+
+        in_place = False
+        if os.path.exists(target):
+            # The temp file belongs to us; hand it to .env's owner and group, or
+            # write in place when we aren't allowed to
+            target_stat = os.stat(target)
+            tmp_stat = os.stat(tmp_path)
+            if (tmp_stat.st_uid, tmp_stat.st_gid) != (target_stat.st_uid, target_stat.st_gid):
+                try:
+                    os.chown(tmp_path, target_stat.st_uid, target_stat.st_gid)
+                except PermissionError:
+                    in_place = True
+            # mkstemp creates the file as 0600; keep the permissions .env already has
+            shutil.copymode(target, tmp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+
+        if not in_place:
+            try:
+                os.replace(tmp_path, target)
+            except OSError as e:
+                # A .env bind-mounted as a single file (e.g. into a container) can't be
+                # renamed over; write it in place instead
+                if e.errno not in (errno.EBUSY, errno.EXDEV):
+                    raise
+                in_place = True
+
+        if in_place:
+            shutil.copyfile(tmp_path, target)
+            os.unlink(tmp_path)
+            synced_path = target
+        else:
+            # The rename lives in the directory entry, so that is what needs syncing
+            synced_path = os.path.dirname(target)
+
+        if durable:
+            sync_fd = os.open(synced_path, os.O_RDONLY)
+            try:
+                os.fsync(sync_fd)
+            finally:
+                os.close(sync_fd)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
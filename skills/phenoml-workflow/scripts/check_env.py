@@ -9,56 +9,75 @@ Usage:
   python3 check_env.py
   python3 check_env.py --help
 
+Set PHENOML_SKIP_DOTENV=1 to ignore ./.env and check only exported variables
+(a file passed with --env-file is still read).
+
 Security: This script only reports presence (true/false), never actual values.
 """
 
 import os
 import sys
-import json
 import argparse
-from dotenv import load_dotenv
+from _common import load_env, is_shared_experiment, json_dumps
+
+CORE_VARS = ("PHENOML_USERNAME", "PHENOML_PASSWORD", "PHENOML_BASE_URL")
+FHIR_CREDENTIAL_VARS = ("FHIR_PROVIDER_BASE_URL", "FHIR_PROVIDER_CLIENT_ID", "FHIR_PROVIDER_CLIENT_SECRET")
+GENERATED_ID_VARS = ("FHIR_PROVIDER_ID", "WORKFLOW_ID")
+
+# Status marks indexed by presence (False -> 0, True -> 1)
+_MARKS = ("❌", "✅")
+
+_MISSING_CORE_MSG = (
+    "\n⚠️  Missing core credentials. Add them to .env file:\n"
+    "   PHENOML_USERNAME=your_username\n"
+    "   PHENOML_PASSWORD=your_password\n"
+    "   PHENOML_BASE_URL=your_base_url\n"
+    "\n   Example PHENOML_BASE_URL values:\n"
+    "   - Shared experiment: https://experiment.app.pheno.ml\n"
+    "   - Dedicated instance: https://yourcompany.app.pheno.ml"
+)
+
+_MISSING_FHIR_MSG = (
+    "\n⚠️  Missing FHIR credentials. Add them to .env file:\n"
+    "   FHIR_PROVIDER_BASE_URL=https://api.medplum.com/fhir/R4\n"
+    "   FHIR_PROVIDER_CLIENT_ID=your_client_id\n"
+    "   FHIR_PROVIDER_CLIENT_SECRET=your_client_secret"
+)
 
 def get_instance_type():
     """
     Determine instance type based on PHENOML_BASE_URL.
     Returns: "shared_experiment", "dedicated", or "unknown"
     """
-    base_url = os.getenv("PHENOML_BASE_URL", "")
-    if not base_url:
+    if not os.getenv("PHENOML_BASE_URL"):
         return "unknown"
-    if "experiment" in base_url.lower():
+    if is_shared_experiment():
         return "shared_experiment"
     return "dedicated"
 
 def check_env_vars(env_file=None):
     """Check presence of required environment variables without exposing values"""
-    if env_file:
-        load_dotenv(env_file)
-    else:
-        load_dotenv()
+    # PHENOML_SKIP_DOTENV only skips the default .env; an explicit --env-file is always read
+    if env_file or os.environ.get("PHENOML_SKIP_DOTENV") != "1":
+        # .env can't change the result if everything we report on is already exported
+        load_env(env_file, required=CORE_VARS + FHIR_CREDENTIAL_VARS + GENERATED_ID_VARS)
 
     instance_type = get_instance_type()
     is_shared = instance_type == "shared_experiment"
 
+    env = os.environ
+
     # Core credentials (always required)
-    core_vars = {
-        "PHENOML_USERNAME": bool(os.getenv("PHENOML_USERNAME")),
-        "PHENOML_PASSWORD": bool(os.getenv("PHENOML_PASSWORD")),
-        "PHENOML_BASE_URL": bool(os.getenv("PHENOML_BASE_URL"))
-    }
+    core_vars = {key: bool(env.get(key)) for key in CORE_VARS}
 
     # FHIR provider credentials (required for dedicated instances, NOT for shared experiment)
-    fhir_credentials = {
-        "FHIR_PROVIDER_BASE_URL": bool(os.getenv("FHIR_PROVIDER_BASE_URL")),
-        "FHIR_PROVIDER_CLIENT_ID": bool(os.getenv("FHIR_PROVIDER_CLIENT_ID")),
-        "FHIR_PROVIDER_CLIENT_SECRET": bool(os.getenv("FHIR_PROVIDER_CLIENT_SECRET"))
-    }
+    fhir_credentials = {key: bool(env.get(key)) for key in FHIR_CREDENTIAL_VARS}
 
     # Generated IDs (created by scripts)
     # For shared experiment, FHIR_PROVIDER_ID defaults to "experiment-default"
     generated_ids = {
-        "FHIR_PROVIDER_ID": bool(os.getenv("FHIR_PROVIDER_ID")) or is_shared,
-        "WORKFLOW_ID": bool(os.getenv("WORKFLOW_ID"))
+        "FHIR_PROVIDER_ID": bool(env.get("FHIR_PROVIDER_ID")) or is_shared,
+        "WORKFLOW_ID": bool(env.get("WORKFLOW_ID"))
     }
 
     return {
@@ -70,102 +89,94 @@ def check_env_vars(env_file=None):
 
 def print_status(status, verbose=False):
     """Print status in a user-friendly format"""
-
-    def check_mark(present):
-        return "✅" if present else "❌"
-
     instance_type = status.get("instance_type", "unknown")
     is_shared = instance_type == "shared_experiment"
     is_dedicated = instance_type == "dedicated"
     is_unknown = instance_type == "unknown"
+    core_ready = all(status["core_credentials"].values())
+    fhir_ready = all(status["fhir_credentials"].values())
+
+    # Collect output lines and write them in one go rather than print()-ing each
+    lines = []
+    emit = lines.append
 
-    print("\n" + "=" * 60)
-    print("ENVIRONMENT VARIABLES STATUS")
+    emit("\n" + "=" * 60)
+    emit("ENVIRONMENT VARIABLES STATUS")
     if is_shared:
-        print("🧪 SHARED EXPERIMENT DETECTED (experiment.app.pheno.ml)")
+        emit("🧪 SHARED EXPERIMENT DETECTED (experiment.app.pheno.ml)")
     elif is_dedicated:
-        print("🏢 DEDICATED INSTANCE")
+        emit("🏢 DEDICATED INSTANCE")
     else:
-        print("❓ INSTANCE TYPE UNKNOWN (PHENOML_BASE_URL not set)")
-    print("=" * 60 + "\n")
+        emit("❓ INSTANCE TYPE UNKNOWN (PHENOML_BASE_URL not set)")
+    emit("=" * 60 + "\n")
 
     # Core credentials
-    print("Core PhenoML Credentials:")
+    emit("Core PhenoML Credentials:")
     for key, present in status["core_credentials"].items():
-        print(f"  {check_mark(present)} {key}")
+        emit(f"  {_MARKS[present]} {key}")
 
-    core_ready = all(status["core_credentials"].values())
     if not core_ready:
-        print("\n⚠️  Missing core credentials. Add them to .env file:")
-        print("   PHENOML_USERNAME=your_username")
-        print("   PHENOML_PASSWORD=your_password")
-        print("   PHENOML_BASE_URL=your_base_url")
-        print("\n   Example PHENOML_BASE_URL values:")
-        print("   - Shared experiment: https://experiment.app.pheno.ml")
-        print("   - Dedicated instance: https://yourcompany.app.pheno.ml")
+        emit(_MISSING_CORE_MSG)
 
     # FHIR credentials
     if is_shared:
-        print("\nFHIR Provider Credentials: (not required for shared experiment)")
-        print("  ℹ️  Shared experiment uses pre-configured Medplum sandbox")
+        emit("\nFHIR Provider Credentials: (not required for shared experiment)")
+        emit("  ℹ️  Shared experiment uses pre-configured Medplum sandbox")
     elif is_unknown:
-        print("\nFHIR Provider Credentials: (status depends on instance type)")
+        emit("\nFHIR Provider Credentials: (status depends on instance type)")
         for key, present in status["fhir_credentials"].items():
-            print(f"  {check_mark(present)} {key}")
-        print("\n  ℹ️  Set PHENOML_BASE_URL first to determine if FHIR credentials are needed")
+            emit(f"  {_MARKS[present]} {key}")
+        emit("\n  ℹ️  Set PHENOML_BASE_URL first to determine if FHIR credentials are needed")
     else:
-        print("\nFHIR Provider Credentials: (required for dedicated instance)")
+        emit("\nFHIR Provider Credentials: (required for dedicated instance)")
         for key, present in status["fhir_credentials"].items():
-            print(f"  {check_mark(present)} {key}")
+            emit(f"  {_MARKS[present]} {key}")
 
-        fhir_ready = all(status["fhir_credentials"].values())
         if not fhir_ready:
-            print("\n⚠️  Missing FHIR credentials. Add them to .env file:")
-            print("   FHIR_PROVIDER_BASE_URL=https://api.medplum.com/fhir/R4")
-            print("   FHIR_PROVIDER_CLIENT_ID=your_client_id")
-            print("   FHIR_PROVIDER_CLIENT_SECRET=your_client_secret")
+            emit(_MISSING_FHIR_MSG)
 
     # Generated IDs
-    print("\nGenerated IDs:")
+    emit("\nGenerated IDs:")
     if is_shared:
         fhir_id_set = bool(os.getenv("FHIR_PROVIDER_ID"))
         if fhir_id_set:
-            print(f"  {check_mark(True)} FHIR_PROVIDER_ID")
+            emit(f"  {_MARKS[True]} FHIR_PROVIDER_ID")
         else:
-            print(f"  {check_mark(True)} FHIR_PROVIDER_ID (using shared experiment default)")
+            emit(f"  {_MARKS[True]} FHIR_PROVIDER_ID (using shared experiment default)")
     else:
-        print(f"  {check_mark(status['generated_ids']['FHIR_PROVIDER_ID'])} FHIR_PROVIDER_ID")
-    print(f"  {check_mark(status['generated_ids']['WORKFLOW_ID'])} WORKFLOW_ID")
+        emit(f"  {_MARKS[status['generated_ids']['FHIR_PROVIDER_ID']]} FHIR_PROVIDER_ID")
+    emit(f"  {_MARKS[status['generated_ids']['WORKFLOW_ID']]} WORKFLOW_ID")
 
     if is_dedicated and not status["generated_ids"]["FHIR_PROVIDER_ID"]:
-        print("\n💡 Run setup_fhir_provider.py to create FHIR provider")
+        emit("\n💡 Run setup_fhir_provider.py to create FHIR provider")
     if not status["generated_ids"]["WORKFLOW_ID"]:
-        print("💡 Run create_workflow.py to create a workflow")
+        emit("💡 Run create_workflow.py to create a workflow")
 
     # Overall status
-    print("\n" + "=" * 60)
+    emit("\n" + "=" * 60)
     if is_unknown:
-        print("⚠️  Set PHENOML_BASE_URL to determine instance type and requirements")
+        emit("⚠️  Set PHENOML_BASE_URL to determine instance type and requirements")
     elif is_shared:
         if core_ready:
-            print("✅ Shared experiment ready to create workflows!")
-            print("   No FHIR provider setup needed - using Medplum sandbox")
+            emit("✅ Shared experiment ready to create workflows!")
+            emit("   No FHIR provider setup needed - using Medplum sandbox")
         else:
-            print("⚠️  Add missing core credentials to .env to proceed")
+            emit("⚠️  Add missing core credentials to .env to proceed")
     else:
-        fhir_ready = all(status["fhir_credentials"].values())
         if core_ready and fhir_ready:
-            print("✅ Dedicated instance ready to create FHIR provider and workflows!")
+            emit("✅ Dedicated instance ready to create FHIR provider and workflows!")
         elif core_ready:
-            print("✅ Core credentials ready")
-            print("⚠️  Add FHIR credentials to proceed with provider setup")
+            emit("✅ Core credentials ready")
+            emit("⚠️  Add FHIR credentials to proceed with provider setup")
         else:
-            print("⚠️  Add missing credentials to .env to proceed")
-    print("=" * 60 + "\n")
+            emit("⚠️  Add missing credentials to .env to proceed")
+    emit("=" * 60 + "\n")
 
     if verbose:
-        print("\nJSON Output:")
-        print(json.dumps(status, indent=2))
+        emit("\nJSON Output:")
+        emit(json_dumps(status))
+
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -192,7 +203,7 @@ def main():
     status = check_env_vars(env_file=args.env_file)
 
     if args.json:
-        print(json.dumps(status, indent=2))
+        print(json_dumps(status))
     else:
         print_status(status, verbose=args.verbose)
 
@@ -27,71 +27,41 @@ Optional:
 
 import os
 import sys
-import json
 import argparse
-from phenoml import Client
-from dotenv import load_dotenv
-
-def save_to_env(key, value, env_file=".env"):
-    """Save or update a key-value pair in .env file"""
-    if not os.path.exists(env_file):
-        with open(env_file, 'w') as f:
-            f.write(f"{key}={value}\n")
-        return
-
-    with open(env_file, 'r') as f:
-        lines = f.readlines()
-
-    found = False
-    for i, line in enumerate(lines):
-        if line.startswith(f"{key}="):
-            lines[i] = f"{key}={value}\n"
-            found = True
-            break
-
-    if not found:
-        if lines and not lines[-1].endswith('\n'):
-            lines.append('\n')
-        lines.append(f"{key}={value}\n")
-
-    with open(env_file, 'w') as f:
-        f.writelines(lines)
+import traceback
+from _common import load_env, help_requested, save_to_env, is_shared_experiment, json_loads
+
+_TRUE_STRINGS = frozenset({'true', '1', 'yes', 'y', 't', 'on'})
 
 def str_to_bool(s):
     """Convert string to boolean"""
-    return s.lower() in ('true', '1', 'yes', 'y')
+    return s.casefold() in _TRUE_STRINGS
 
 # Default FHIR provider ID for shared experiment users
 SHARED_EXPERIMENT_DEFAULT_FHIR_PROVIDER_ID = "experiment-default"
 
-def is_shared_experiment():
-    """Check if the user is on shared experiment (experiment.app.pheno.ml) based on PHENOML_BASE_URL"""
-    base_url = os.getenv("PHENOML_BASE_URL", "")
-    return "experiment" in base_url.lower()
-
 def main():
-    parser = argparse.ArgumentParser(description='Create a PhenoML workflow')
-    parser.add_argument('--name', help='Workflow name')
-    parser.add_argument('--instructions', help='Workflow instructions')
-    parser.add_argument('--sample-data', help='Sample data as JSON string')
-    parser.add_argument('--dynamic-generation', type=str_to_bool, help='Enable dynamic generation (true/false)')
-    parser.add_argument('--verbose', type=str_to_bool, help='Verbose mode (true/false)')
-    parser.add_argument('--provider-id', help='FHIR provider ID (overrides .env)')
-    parser.add_argument('--env-file', help='Path to .env file (defaults to .env in current directory)')
+    # .env supplies the argument defaults, so load it before building the full parser
+    env_parser = argparse.ArgumentParser(add_help=False)
+    env_parser.add_argument('--env-file', default=".env", help='Path to .env file (defaults to .env in current directory)')
+    env_args, remaining = env_parser.parse_known_args()
+    env_file = env_args.env_file or ".env"
+    # --help only prints usage, so it skips importing dotenv and reading .env
+    if not help_requested(remaining):
+        load_env(env_file)
+
+    # CLI args override .env
+    env = os.environ
+    parser = argparse.ArgumentParser(description='Create a PhenoML workflow', parents=[env_parser])
+    parser.add_argument('--name', default=env.get("WORKFLOW_NAME"), help='Workflow name')
+    parser.add_argument('--instructions', default=env.get("WORKFLOW_INSTRUCTIONS"), help='Workflow instructions')
+    parser.add_argument('--sample-data', default=env.get("WORKFLOW_SAMPLE_DATA"), help='Sample data as JSON string')
+    parser.add_argument('--dynamic-generation', type=str_to_bool, default=env.get("WORKFLOW_DYNAMIC_GENERATION", "true"), help='Enable dynamic generation (true/false)')
+    parser.add_argument('--verbose', type=str_to_bool, default=env.get("WORKFLOW_VERBOSE", "false"), help='Verbose mode (true/false)')
+    parser.add_argument('--provider-id', default=env.get("FHIR_PROVIDER_ID"), help='FHIR provider ID (overrides .env)')
 
     args = parser.parse_args()
-
-    # Load environment
-    env_file = args.env_file or ".env"
-    load_dotenv(env_file)
-
-    # Get configuration (CLI args override .env)
-    name = args.name or os.getenv("WORKFLOW_NAME")
-    instructions = args.instructions or os.getenv("WORKFLOW_INSTRUCTIONS")
-    sample_data_str = args.sample_data or os.getenv("WORKFLOW_SAMPLE_DATA")
-    dynamic_generation = args.dynamic_generation if args.dynamic_generation is not None else str_to_bool(os.getenv("WORKFLOW_DYNAMIC_GENERATION", "true"))
-    verbose = args.verbose if args.verbose is not None else str_to_bool(os.getenv("WORKFLOW_VERBOSE", "false"))
-    provider_id = args.provider_id or os.getenv("FHIR_PROVIDER_ID")
+    provider_id = args.provider_id
 
     # For shared experiment, use default FHIR provider ID if not specified
     using_shared_experiment_default = False
@@ -100,17 +70,17 @@ def main():
         using_shared_experiment_default = True
 
     # Validate required fields
-    if not name:
+    if not args.name:
         print("❌ Error: Workflow name is required")
         print("   Set WORKFLOW_NAME in .env, or use --name")
         sys.exit(1)
 
-    if not instructions:
+    if not args.instructions:
         print("❌ Error: Workflow instructions are required")
         print("   Set WORKFLOW_INSTRUCTIONS in .env, or use --instructions")
         sys.exit(1)
 
-    if not sample_data_str:
+    if not args.sample_data:
         print("❌ Error: Sample data is required")
         print("   Set WORKFLOW_SAMPLE_DATA in .env, or use --sample-data")
         sys.exit(1)
@@ -122,12 +92,14 @@ def main():
 
     # Parse sample data
     try:
-        sample_data = json.loads(sample_data_str)
-    except json.JSONDecodeError as e:
+        sample_data = json_loads(args.sample_data)
+    except ValueError as e:
         print(f"❌ Error: Invalid JSON in sample data: {e}")
         sys.exit(1)
 
-    # Initialize PhenoML client
+    # Initialize PhenoML client (imported here so --help and validation errors skip the SDK import)
+    from phenoml import Client
+
     print("Initializing PhenoML client...")
     try:
         client = Client(
@@ -143,23 +115,23 @@ def main():
 
     # Create workflow
     print(f"Creating workflow:")
-    print(f"  Name: {name}")
+    print(f"  Name: {args.name}")
     if using_shared_experiment_default:
         print(f"  Provider ID: {provider_id} (shared experiment default)")
     else:
         print(f"  Provider ID: {provider_id}")
-    print(f"  Dynamic generation: {dynamic_generation}")
-    print(f"  Verbose: {verbose}")
-    print(f"  Sample data: {json.dumps(sample_data, indent=2)}\n")
+    print(f"  Dynamic generation: {args.dynamic_generation}")
+    print(f"  Verbose: {args.verbose}")
+    print(f"  Sample data: {args.sample_data}\n")
 
     try:
         workflow = client.workflows.create(
-            name=name,
-            workflow_instructions=instructions,
+            name=args.name,
+            workflow_instructions=args.instructions,
             sample_data=sample_data,
             fhir_provider_id=provider_id,
-            verbose=verbose,
-            dynamic_generation=dynamic_generation
+            verbose=args.verbose,
+            dynamic_generation=args.dynamic_generation
         )
 
         workflow_id = workflow.workflow_id
@@ -173,7 +145,6 @@ def main():
 
     except Exception as e:
         print(f"❌ Failed to create workflow: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
@@ -28,82 +28,59 @@ Optional .env variables:
 import os
 import sys
 import argparse
-from phenoml import Client
-from dotenv import load_dotenv
-
-def save_to_env(key, value, env_file=".env"):
-    """Save or update a key-value pair in .env file"""
-    if not os.path.exists(env_file):
-        with open(env_file, 'w') as f:
-            f.write(f"{key}={value}\n")
-        return
-
-    with open(env_file, 'r') as f:
-        lines = f.readlines()
-
-    found = False
-    for i, line in enumerate(lines):
-        if line.startswith(f"{key}="):
-            lines[i] = f"{key}={value}\n"
-            found = True
-            break
-
-    if not found:
-        if lines and not lines[-1].endswith('\n'):
-            lines.append('\n')
-        lines.append(f"{key}={value}\n")
-
-    with open(env_file, 'w') as f:
-        f.writelines(lines)
+import traceback
+from _common import load_env, help_requested, save_to_env
+
+_MISSING_BASE_URL_MSG = (
+    "❌ Error: FHIR base URL is required\n"
+    "   Set FHIR_PROVIDER_BASE_URL in .env, or use --base-url\n"
+    "\n   Example values:\n"
+    "   - Medplum: https://api.medplum.com/fhir/R4\n"
+    "   - Athena: https://api.preview.platform.athenahealth.com/fhir/r4\n"
+    "   - Epic: https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4\n"
+    "   - Cerner: https://fhir-myrecord.cerner.com/r4/[tenant-id]"
+)
 
 def main():
-    parser = argparse.ArgumentParser(description='Create a FHIR provider for PhenoML workflows')
-    parser.add_argument('--name', help='FHIR provider name')
-    parser.add_argument('--provider', help='Provider type (medplum, epic, cerner, etc.)')
-    parser.add_argument('--auth-method', help='Auth method (default: client_secret)')
-    parser.add_argument('--base-url', help='FHIR base URL')
-    parser.add_argument('--client-id', help='Client ID')
-    parser.add_argument('--client-secret', help='Client secret')
-    parser.add_argument('--env-file', help='Path to .env file (defaults to .env in current directory)')
+    # .env supplies the argument defaults, so load it before building the full parser
+    env_parser = argparse.ArgumentParser(add_help=False)
+    env_parser.add_argument('--env-file', default=".env", help='Path to .env file (defaults to .env in current directory)')
+    env_args, remaining = env_parser.parse_known_args()
+    env_file = env_args.env_file or ".env"
+    # --help only prints usage, so it skips importing dotenv and reading .env
+    if not help_requested(remaining):
+        load_env(env_file)
+
+    # CLI args override .env
+    env = os.environ
+    parser = argparse.ArgumentParser(description='Create a FHIR provider for PhenoML workflows', parents=[env_parser])
+    parser.add_argument('--name', default=env.get("FHIR_PROVIDER_NAME", "FHIR Server"), help='FHIR provider name')
+    parser.add_argument('--provider', default=env.get("FHIR_PROVIDER_TYPE", "medplum"), help='Provider type (medplum, epic, cerner, etc.)')
+    parser.add_argument('--auth-method', default=env.get("FHIR_AUTH_METHOD", "client_secret"), help='Auth method (default: client_secret)')
+    parser.add_argument('--base-url', default=env.get("FHIR_PROVIDER_BASE_URL"), help='FHIR base URL')
+    parser.add_argument('--client-id', default=env.get("FHIR_PROVIDER_CLIENT_ID"), help='Client ID')
+    parser.add_argument('--client-secret', default=env.get("FHIR_PROVIDER_CLIENT_SECRET"), help='Client secret')
 
     args = parser.parse_args()
 
-    # Load environment
-    env_file = args.env_file or ".env"
-    load_dotenv(env_file)
-
-    # Get configuration (CLI args override .env)
-    name = args.name or os.getenv("FHIR_PROVIDER_NAME", "FHIR Server")
-    provider_type = args.provider or os.getenv("FHIR_PROVIDER_TYPE", "medplum")
-    auth_method = args.auth_method or os.getenv("FHIR_AUTH_METHOD", "client_secret")
-
-    # Get FHIR provider credentials (CLI args override .env)
-    base_url = args.base_url or os.getenv("FHIR_PROVIDER_BASE_URL")
-    client_id = args.client_id or os.getenv("FHIR_PROVIDER_CLIENT_ID")
-    client_secret = args.client_secret or os.getenv("FHIR_PROVIDER_CLIENT_SECRET")
-
     # Validate required fields
-    if not base_url:
-        print("❌ Error: FHIR base URL is required")
-        print("   Set FHIR_PROVIDER_BASE_URL in .env, or use --base-url")
-        print("\n   Example values:")
-        print("   - Medplum: https://api.medplum.com/fhir/R4")
-        print("   - Athena: https://api.preview.platform.athenahealth.com/fhir/r4")
-        print("   - Epic: https://fhir.epic.com/interconnect-fhir-oauth/api/FHIR/R4")
-        print("   - Cerner: https://fhir-myrecord.cerner.com/r4/[tenant-id]")
+    if not args.base_url:
+        print(_MISSING_BASE_URL_MSG)
         sys.exit(1)
 
-    if not client_id:
+    if not args.client_id:
         print("❌ Error: Client ID is required")
         print("   Set FHIR_PROVIDER_CLIENT_ID in .env, or use --client-id")
         sys.exit(1)
 
-    if not client_secret:
+    if not args.client_secret:
         print("❌ Error: Client secret is required")
         print("   Set FHIR_PROVIDER_CLIENT_SECRET in .env, or use --client-secret")
         sys.exit(1)
 
-    # Initialize PhenoML client
+    # Initialize PhenoML client (imported here so --help and validation errors skip the SDK import)
+    from phenoml import Client
+
     print("Initializing PhenoML client...")
     try:
         client = Client(
@@ -119,19 +96,19 @@ def main():
 
     # Create FHIR provider
     print(f"Creating FHIR provider:")
-    print(f"  Name: {name}")
-    print(f"  Provider: {provider_type}")
-    print(f"  Base URL: {base_url}")
-    print(f"  Auth method: {auth_method}\n")
+    print(f"  Name: {args.name}")
+    print(f"  Provider: {args.provider}")
+    print(f"  Base URL: {args.base_url}")
+    print(f"  Auth method: {args.auth_method}\n")
 
     try:
         fhir_provider = client.fhir_provider.create(
-            name=name,
-            provider=provider_type,
-            auth_method=auth_method,
-            base_url=base_url,
-            client_id=client_id,
-            client_secret=client_secret
+            name=args.name,
+            provider=args.provider,
+            auth_method=args.auth_method,
+            base_url=args.base_url,
+            client_id=args.client_id,
+            client_secret=args.client_secret
         )
 
         provider_id = fhir_provider.data.id
@@ -145,7 +122,6 @@ def main():
 
     except Exception as e:
         print(f"❌ Failed to create FHIR provider: {e}")
-        import traceback
         traceback.print_exc()
         sys.exit(1)
 
@@ -16,31 +16,105 @@ Required .env variables:
 Test configuration (.env or CLI args):
   WORKFLOW_ID or --workflow-id
   WORKFLOW_TEST_DATA (JSON string) or --input-data or --input-file
+
+Optional:
+  PHENOML_NO_CLIENT_CACHE=1 to build a fresh client on every main() call
 """
 
 import os
 import sys
-import json
 import argparse
-from phenoml import Client
-from dotenv import load_dotenv
+import functools
+import traceback
+from _common import load_env, json_loads, json_dumps
+
+# Inputs whose raw JSON is larger than this are summarized instead of echoed back in full
+MAX_ECHO_BYTES = 64 * 1024
+
+# JSON names for the Python types json_loads can return, used in shape errors
+_JSON_TYPE_NAMES = {
+    list: "array",
+    str: "string",
+    int: "number",
+    float: "number",
+    bool: "boolean",
+    type(None): "null",
+}
+
+def parse_input_data(data):
+    """
+    Parse workflow input JSON, which the API requires to be an object.
+    Raises ValueError if the data isn't valid JSON and TypeError if it isn't an object.
+    """
+    input_data = json_loads(data)
+    if not isinstance(input_data, dict):
+        type_name = _JSON_TYPE_NAMES.get(type(input_data), type(input_data).__name__)
+        raise TypeError(f"input data must be a JSON object, got {type_name}")
+    return input_data
+
+def json_arg(value):
+    """Parse a JSON string argument, returning (input_data, raw size in bytes)"""
+    raw = os.fsencode(value)
+    try:
+        return parse_input_data(raw), len(raw)
+    except TypeError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid JSON: {e}")
+
+def json_file_arg(path):
+    """Read and parse a JSON file argument, returning (input_data, raw size in bytes)"""
+    try:
+        # Hand the raw bytes to the parser rather than decoding to str first
+        with open(path, 'rb') as f:
+            raw = f.read()
+        return parse_input_data(raw), len(raw)
+    except FileNotFoundError:
+        raise argparse.ArgumentTypeError(f"file not found: {path}")
+    except TypeError as e:
+        raise argparse.ArgumentTypeError(f"{path}: {e}")
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid JSON in file {path}: {e}")
+
+@functools.lru_cache(maxsize=4)
+def get_client(username, password, base_url):
+    """Create a PhenoML client, reused for repeated calls with the same credentials"""
+    # Imported here so --help and validation errors skip the SDK import
+    from phenoml import Client
+
+    return Client(
+        username=username,
+        password=password,
+        base_url=base_url
+    )
 
 def main():
     parser = argparse.ArgumentParser(description='Test a PhenoML workflow')
     parser.add_argument('--workflow-id', help='Workflow ID to test')
-    parser.add_argument('--input-data', help='Input data as JSON string')
-    parser.add_argument('--input-file', help='Path to JSON file with input data')
+    input_group = parser.add_mutually_exclusive_group()
+    input_group.add_argument('--input-data', type=json_arg, help='Input data as JSON string')
+    input_group.add_argument('--input-file', type=json_file_arg, help='Path to JSON file with input data')
     parser.add_argument('--output-file', help='Save results to JSON file')
     parser.add_argument('--env-file', help='Path to .env file (defaults to .env in current directory)')
 
     args = parser.parse_args()
 
-    # Load environment
+    # Load environment, skipping .env when everything we'd read from it is already exported
+    required = ["PHENOML_USERNAME", "PHENOML_PASSWORD", "PHENOML_BASE_URL"]
+    if not args.workflow_id:
+        required.append("WORKFLOW_ID")
+    if args.input_file is None and args.input_data is None:
+        required.append("WORKFLOW_TEST_DATA")
     env_file = args.env_file or ".env"
-    load_dotenv(env_file)
+    load_env(env_file, required=required)
 
     # Get configuration (CLI args override .env)
-    workflow_id = args.workflow_id or os.getenv("WORKFLOW_ID")
+    env = os.environ
+    workflow_id = args.workflow_id or env.get("WORKFLOW_ID")
+    test_data_str = env.get("WORKFLOW_TEST_DATA")
+    username = env.get("PHENOML_USERNAME")
+    password = env.get("PHENOML_PASSWORD")
+    base_url = env.get("PHENOML_BASE_URL")
 
     # Validate workflow ID
     if not workflow_id:
@@ -48,36 +122,23 @@ def main():
         print("   Set WORKFLOW_ID in .env, or use --workflow-id")
         sys.exit(1)
 
-    # Get input data from various sources
-    input_data = None
-
-    if args.input_file:
-        # Load from file
+    # Get input data from --input-file or --input-data (parsed by argparse), else from .env
+    input_data, input_size = None, 0
+    source = args.input_file if args.input_file is not None else args.input_data
+    if source is not None:
+        input_data, input_size = source
+    elif test_data_str:
+        # Try to load from .env
+        raw = os.fsencode(test_data_str)
         try:
-            with open(args.input_file, 'r') as f:
-                input_data = json.load(f)
-        except FileNotFoundError:
-            print(f"❌ Error: File not found: {args.input_file}")
-            sys.exit(1)
-        except json.JSONDecodeError as e:
-            print(f"❌ Error: Invalid JSON in file {args.input_file}: {e}")
+            input_data = parse_input_data(raw)
+        except TypeError as e:
+            print(f"❌ Error: Invalid WORKFLOW_TEST_DATA: {e}")
             sys.exit(1)
-    elif args.input_data:
-        # Parse from CLI arg
-        try:
-            input_data = json.loads(args.input_data)
-        except json.JSONDecodeError as e:
-            print(f"❌ Error: Invalid JSON in input data: {e}")
+        except ValueError as e:
+            print(f"❌ Error: Invalid JSON in WORKFLOW_TEST_DATA: {e}")
             sys.exit(1)
-    else:
-        # Try to load from .env
-        test_data_str = os.getenv("WORKFLOW_TEST_DATA")
-        if test_data_str:
-            try:
-                input_data = json.loads(test_data_str)
-            except json.JSONDecodeError as e:
-                print(f"❌ Error: Invalid JSON in WORKFLOW_TEST_DATA: {e}")
-                sys.exit(1)
+        input_size = len(raw)
 
     if not input_data:
         print("❌ Error: Input data is required")
@@ -87,23 +148,30 @@ def main():
     # Initialize PhenoML client
     print("Initializing PhenoML client...")
     try:
-        client = Client(
-            username=os.getenv("PHENOML_USERNAME"),
-            password=os.getenv("PHENOML_PASSWORD"),
-            base_url=os.getenv("PHENOML_BASE_URL")
-        )
+        if env.get("PHENOML_NO_CLIENT_CACHE") == "1":
+            client = get_client.__wrapped__(username, password, base_url)
+        else:
+            client = get_client(username, password, base_url)
         print("✅ PhenoML client initialized\n")
     except Exception as e:
         print(f"❌ Failed to initialize PhenoML client: {e}")
         print("   Make sure PHENOML_USERNAME, PHENOML_PASSWORD, and PHENOML_BASE_URL are set in .env")
         sys.exit(1)
 
-    # Execute workflow
-    print(f"Testing workflow:")
-    print(f"  Workflow ID: {workflow_id}")
-    print(f"  Input data:")
-    print(json.dumps(input_data, indent=4))
-    print("\n⏳ Executing workflow (this may take a moment)...\n")
+    # Execute workflow (write the banner in one go and flush it before the request blocks)
+    # Decide from the raw size so oversized inputs are never serialized just to be dropped
+    if input_size > MAX_ECHO_BYTES:
+        input_json = f"  <{input_size} bytes, not shown>"
+    else:
+        input_json = json_dumps(input_data)
+    sys.stdout.write("\n".join([
+        "Testing workflow:",
+        f"  Workflow ID: {workflow_id}",
+        "  Input data:",
+        input_json,
+        "\n⏳ Executing workflow (this may take a moment)...\n",
+    ]) + "\n")
+    sys.stdout.flush()
 
     try:
         result = client.workflows.execute(
@@ -111,26 +179,31 @@ def main():
             input_data=input_data
         )
 
-        print("✅ Workflow executed successfully!\n")
-        print("=" * 60)
-        print("EXECUTION RESULTS")
-        print("=" * 60)
-
-        result_dict = result.model_dump()
-        print(json.dumps(result_dict, indent=2))
+        # Serialize once and reuse the text for both stdout and --output-file.
+        # model_dump() rather than model_dump_json(): the SDK's JSON serializer
+        # routes through .dict(), which runs model_dump() twice and renames keys to aliases
+        result_json = json_dumps(result.model_dump())
+        sys.stdout.write("\n".join([
+            "✅ Workflow executed successfully!\n",
+            "=" * 60,
+            "EXECUTION RESULTS",
+            "=" * 60,
+            result_json,
+        ]) + "\n")
 
         # Save to file if requested
         if args.output_file:
-            with open(args.output_file, 'w') as f:
-                json.dump(result_dict, f, indent=2)
+            with open(args.output_file, 'w', encoding='utf-8') as f:
+                f.write(result_json)
             print(f"\n💾 Results saved to {args.output_file}")
 
         print("\n🎉 Test complete!")
 
     except Exception as e:
-        print(f"❌ Workflow execution failed: {e}")
-        import traceback
-        traceback.print_exc()
+        # Flush pending stdout first so the error lands after any output already shown
+        sys.stdout.flush()
+        sys.stderr.write(f"❌ Workflow execution failed: {e}\n{traceback.format_exc()}")
+        sys.stderr.flush()
         sys.exit(1)
 
 if __name__ == "__main__":